@@ -7,46 +7,189 @@ Can be run manually or scheduled via cron.
 
 import os
 import asyncio
+import atexit
 import logging
+import queue
+import itertools
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from logging.handlers import QueueHandler, QueueListener
 from datetime import datetime
 from dotenv import load_dotenv
-from services.price_checker import PriceCheckerConfig, PriceChecker
-
-# Set up logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.FileHandler(f'logs/price_checker_{datetime.now().strftime("%Y%m%d")}.log'),
-        logging.StreamHandler()
-    ]
-)
+from services.price_checker import PriceCheckerConfig, PriceChecker, SupabaseClient, SEARCH_KEY_FIELDS
+
+FLUSH_INTERVAL = 0.5
+FLUSH_SIZE = 100
+
+def setup_logging(log_queue):
+    """Route log records through a queue so workers never block on the log file"""
+    log_formatter = logging.Formatter('%(asctime)s - %(levelname)s - %(message)s')
+    file_handler = logging.FileHandler(f'logs/price_checker_{datetime.now().strftime("%Y%m%d")}.log')
+    stream_handler = logging.StreamHandler()
+    for handler in (file_handler, stream_handler):
+        handler.setFormatter(log_formatter)
+    
+    listener = QueueListener(log_queue, file_handler, stream_handler)
+    listener.start()
+    atexit.register(listener.stop)
+    
+    logging.basicConfig(
+        level=logging.INFO,
+        handlers=[QueueHandler(log_queue)]
+    )
+
+def init_worker(log_queue, worker_counter):
+    """Send a worker process's log records to the parent's listener"""
+    root = logging.getLogger()
+    root.handlers = [QueueHandler(log_queue)]
+    root.setLevel(logging.INFO)
+    
+    # Give each process its own set of persistent Chrome profiles
+    with worker_counter.get_lock():
+        worker_counter.value += 1
+        worker_index = worker_counter.value
+    if os.getenv('CHROME_PROFILE_DIR'):
+        os.environ['CHROME_PROFILE_DIR'] = os.path.join(os.environ['CHROME_PROFILE_DIR'], f"process-{worker_index}")
+
+async def store_rows(checker, rows):
+    """Drain price rows from the queue, flushing every FLUSH_SIZE rows or FLUSH_INTERVAL seconds"""
+    batch = []
+    done = False
+    loop = asyncio.get_running_loop()
+    
+    while not done:
+        deadline = loop.time() + FLUSH_INTERVAL
+        while len(batch) < FLUSH_SIZE:
+            try:
+                row = await asyncio.wait_for(rows.get(), timeout=max(deadline - loop.time(), 0))
+            except asyncio.TimeoutError:
+                break
+            if row is None:
+                done = True
+                break
+            batch.append(row)
+        
+        if batch:
+            try:
+                await asyncio.to_thread(checker.supabase.store_prices_batch, batch)
+            except Exception as e:
+                logging.error(f"Error storing {len(batch)} price rows: {str(e)}")
+            batch = []
+
+async def check_bookings(booking_pages, concurrency):
+    """
+    Check prices for pages of bookings on one PriceChecker and its driver pool.
+    Pages are fetched in the background so scraping starts with the first one.
+    """
+    # Initialize service with one pooled driver per concurrent worker
+    async with PriceChecker(PriceCheckerConfig(), pool_size=concurrency) as checker:
+        # Workers hand their rows to a single writer that inserts them in batches
+        rows = asyncio.Queue()
+        writer = asyncio.create_task(store_rows(checker, rows))
+        
+        tasks = asyncio.Queue()
+        
+        async def enqueue_bookings():
+            pages = iter(booking_pages)
+            try:
+                while (page := await asyncio.to_thread(next, pages, None)) is not None:
+                    for booking in page:
+                        tasks.put_nowait(booking)
+            finally:
+                # One stop marker per worker, even if fetching a page failed
+                for _ in range(concurrency):
+                    tasks.put_nowait(None)
+        
+        # Check prices concurrently, one worker per pooled driver
+        async def check_worker():
+            while (booking := await tasks.get()) is not None:
+                try:
+                    prices = await checker.check_prices(booking, store=False)
+                    rows.put_nowait(checker.supabase.build_price_row(booking['id'], prices))
+                except Exception as e:
+                    logging.error(f"Error checking prices for booking {booking['id']}: {str(e)}")
+        
+        producer = asyncio.create_task(enqueue_bookings())
+        workers = [asyncio.create_task(check_worker()) for _ in range(concurrency)]
+        try:
+            # Workers finish the bookings already queued even if a later page fails to load
+            await asyncio.gather(*workers)
+        finally:
+            # Stop everything still leasing drivers before the checker closes its pool
+            for task in (producer, *workers):
+                task.cancel()
+            await asyncio.gather(producer, *workers, return_exceptions=True)
+            rows.put_nowait(None)
+            await writer
+        
+        # Surface a failed page fetch once the checked rows are stored
+        producer.result()
+
+def check_bookings_in_process(page_queue, concurrency):
+    """
+    Process pool entry point: check every page routed to this process on one
+    PriceChecker, so its browsers, client and price cache live as long as the process.
+    """
+    asyncio.run(check_bookings(iter(page_queue.get, None), concurrency))
 
 async def main():
     try:
         # Load environment variables
         load_dotenv()
         
-        # Initialize service
+        concurrency = int(os.getenv('PRICE_CHECKER_CONCURRENCY', '4'))
+        processes = int(os.getenv('PRICE_CHECKER_PROCESSES', '1'))
         config = PriceCheckerConfig()
-        checker = PriceChecker(config)
         
-        # Get active bookings
-        bookings = checker.supabase.client.table('bookings').select('id').execute()
+        # Stream active bookings page by page
+        booking_pages = SupabaseClient(config).iter_booking_pages()
+        first_page = next(booking_pages, None)
         
-        if not bookings.data:
+        if not first_page:
             logging.info("No active bookings found")
             return
+        booking_pages = itertools.chain([first_page], booking_pages)
         
-        # Check prices for each booking
-        for booking in bookings.data:
+        if processes > 1:
+            # Prefork mode: each process gets its own interpreter, Chrome pool and Supabase client.
+            # Spawn rather than fork so children don't inherit this process's HTTP connections.
+            mp_context = multiprocessing.get_context('spawn')
+            worker_log_queue = mp_context.Queue(-1)
+            log_listener = QueueListener(worker_log_queue, *logging.getLogger().handlers)
+            log_listener.start()
             try:
-                await checker.check_prices(booking['id'])
-                # Add delay between checks to avoid rate limiting
-                await asyncio.sleep(5)
-            except Exception as e:
-                logging.error(f"Error checking prices for booking {booking['id']}: {str(e)}")
-                continue
+                with mp_context.Manager() as manager, ProcessPoolExecutor(
+                    max_workers=processes,
+                    mp_context=mp_context,
+                    initializer=init_worker,
+                    initargs=(worker_log_queue, mp_context.Value('i', 0))
+                ) as executor:
+                    # One long-lived check per process, fed pages through its own queue
+                    page_queues = [manager.Queue() for _ in range(processes)]
+                    futures = [
+                        executor.submit(check_bookings_in_process, page_queue, concurrency)
+                        for page_queue in page_queues
+                    ]
+                    try:
+                        # Route bookings by search key so identical searches share a
+                        # process and its price cache
+                        for page in booking_pages:
+                            shards = [[] for _ in range(processes)]
+                            for booking in page:
+                                search_key = tuple(booking[field] for field in SEARCH_KEY_FIELDS)
+                                shards[hash(search_key) % processes].append(booking)
+                            for page_queue, shard in zip(page_queues, shards):
+                                if shard:
+                                    page_queue.put(shard)
+                    finally:
+                        for page_queue in page_queues:
+                            page_queue.put(None)
+                    for future in futures:
+                        future.result()
+            finally:
+                log_listener.stop()
+        else:
+            await check_bookings(booking_pages, concurrency)
         
         logging.info("✅ Price checking completed")
         
@@ -55,4 +198,5 @@ async def main():
         raise
 
 if __name__ == "__main__":
+    setup_logging(queue.Queue(-1))
     asyncio.run(main())
\ No newline at end of file
@@ -6,17 +6,79 @@ Follows SOLID principles with single responsibility classes and dependency injec
 """
 
 import os
+import re
+import asyncio
+import logging
+import atexit
+import functools
+import itertools
+import contextlib
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
+from pathlib import Path
 import json
-from typing import Dict, List, Optional
-import time
+from typing import Callable, Dict, Iterator, List, Optional, Union
 from selenium import webdriver
+from selenium.common.exceptions import TimeoutException
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 from selenium.webdriver.support.ui import Select
 from selenium.webdriver.chrome.service import Service
-from supabase import create_client, Client
+import httpx
+from cachetools import TTLCache
+from supabase import create_client, Client, ClientOptions
+
+# Booking fields needed to fill the search form
+BOOKING_COLUMNS = 'id,location,pickup_date,dropoff_date,pickup_time,dropoff_time'
+BOOKINGS_PAGE_SIZE = 500
+# Ids per .in_() filter, keeping the request URL well under server limits
+BOOKING_IDS_PER_QUERY = 100
+# Rows per price_history insert
+PRICE_ROWS_PER_INSERT = 500
+
+# Bookings with identical search parameters share scraped prices for a short while
+SEARCH_KEY_FIELDS = ('location', 'pickup_date', 'dropoff_date', 'pickup_time', 'dropoff_time')
+PRICE_CACHE_SIZE = 256
+PRICE_CACHE_TTL = 900
+
+# Scraped prices outside these bounds are treated as bad reads
+MIN_PRICE = 20.0
+MAX_PRICE = 5000.0
+
+# Page selectors, built once at import instead of on every call
+ROW_SELECTOR = (By.CSS_SELECTOR, 'div[role="row"]')
+CATEGORY_NAME_SELECTOR = (By.CSS_SELECTOR, '.car-category-name')
+PRICED_CARD_SELECTOR = (By.CSS_SELECTOR, '.car-result-card.lowest-price[data-price]')
+RESULT_CARD_SELECTOR = (By.CSS_SELECTOR, 'div[role="row"] .car-result-card')
+LOCATION_INPUT = (By.ID, "pickupLocationTextWidget")
+FIRST_SUGGESTION_SELECTOR = (By.CSS_SELECTOR, "ul.ui-autocomplete li:first-child")
+PICKUP_TIME_SELECT = (By.ID, "pickupTimeWidget")
+DROPOFF_TIME_SELECT = (By.ID, "dropoffTimeWidget")
+SEARCH_BUTTON = (By.ID, "findMyCarButton")
+FORM_WIDGET_IDS = [
+    'pickupLocationTextWidget', 'pickUpDateWidget', 'dropOffDateWidget',
+    'pickupTimeWidget', 'dropoffTimeWidget', 'driversAgeWidget', 'findMyCarButton'
+]
+FORM_LOAD_TIMEOUT = 20
+# Booking dates are stored as ISO dates; the form takes MM/DD/YYYY
+ISO_DATE_PATTERN = re.compile(r'\d{4}-\d{2}-\d{2}')
+# Upper bound for driver.get; with the eager strategy it only covers DOMContentLoaded
+PAGE_LOAD_TIMEOUT = 20
+
+# Costco's time dropdowns label these two times by name
+COSTCO_TIME_LABELS = {"12:00 PM": "Noon", "12:00 AM": "Midnight"}
+LOCATION_SUGGESTION_SELECTOR = (By.CSS_SELECTOR, "ul.ui-autocomplete li.ui-menu-item span")
+
+# Sub-resources the price scrape never reads
+BLOCKED_URL_PATTERNS = [
+    '*.png', '*.jpg', '*.jpeg', '*.gif', '*.webp', '*.svg', '*.ico',
+    '*.woff*', '*.ttf', '*.otf',
+    '*.mp4', '*.webm',
+    '*/analytics*', '*google-analytics*', '*doubleclick*', '*googletagmanager*',
+    '*adobedtm*', '*facebook.net*'
+]
 
 class PriceCheckerConfig:
     """Configuration for the price checker service"""
@@ -25,6 +87,21 @@ class PriceCheckerConfig:
         self.supabase_key = os.getenv('SUPABASE_SERVICE_KEY')
         self.chrome_binary = os.getenv('CHROME_BINARY_PATH')
         self.chromedriver_path = os.getenv('CHROMEDRIVER_PATH')
+        self.chromedriver_verbose = os.getenv('CHROMEDRIVER_VERBOSE') == '1'
+        # Save screenshots of each step under logs/
+        self.debug = os.getenv('PRICE_CHECKER_DEBUG') == '1'
+        # Optional base directory for persistent Chrome profiles (HTTP and V8 code caches)
+        self.chrome_profile_dir = os.getenv('CHROME_PROFILE_DIR')
+        # Headless mode: unset for a visible browser, 'old' for the lighter DOM-only
+        # mode (chrome-headless-shell on Chrome 132+), or 'new' for full headless Chrome;
+        # an empty value, as in .env templates, also means a visible browser
+        self.chrome_headless = os.getenv('CHROME_HEADLESS') or None
+        # Minimum seconds between searches started against costcotravel.com, shared by
+        # every pooled driver of a PriceChecker (so per process in prefork mode)
+        self.min_request_interval = float(os.getenv('PRICE_CHECKER_MIN_INTERVAL', '5'))
+        
+        if self.chrome_headless not in (None, 'old', 'new'):
+            raise ValueError("CHROME_HEADLESS must be 'old' or 'new'")
         
         if not all([self.supabase_url, self.supabase_key, 
                    self.chrome_binary, self.chromedriver_path]):
@@ -34,104 +111,353 @@ class PriceExtractor:
     def __init__(self, driver: webdriver.Chrome):
         self.driver = driver
     
-    def validate_price(self, price: float, category: str) -> bool:
-        """Validate extracted price is within reasonable bounds"""
-        MIN_PRICE = 20.0
-        MAX_PRICE = 5000.0
-        
-        if not MIN_PRICE <= price <= MAX_PRICE:
-            print(f"Warning: Suspicious price ${price:.2f} for {category}")
-            return False
-        return True
     #
     def extract_prices(self) -> Dict[str, float]:
         """Extract prices for all car categories"""
-        prices = {}
-        
         # Wait for price elements with increased timeout
         WebDriverWait(self.driver, 30).until(
-            EC.presence_of_element_located((By.CSS_SELECTOR, 'div[role="row"]'))
+            EC.presence_of_element_located(ROW_SELECTOR)
         )
         
-        car_rows = self.driver.find_elements(By.CSS_SELECTOR, 'div[role="row"]')
-        print(f"Found {len(car_rows)} car categories")
+        # Read and validate every price in one round-trip: start from the lowest-price
+        # cards and walk up to their row for the category name
+        result = self.driver.execute_script("""
+            const [rowSelector, categorySelector, priceSelector, minPrice, maxPrice] = arguments;
+            const accepted = {}, rejected = {};
+            for (const price of document.querySelectorAll(priceSelector)) {
+                const category = price.closest(rowSelector)?.querySelector(categorySelector);
+                const value = parseFloat(price.getAttribute('data-price'));
+                if (category && !Number.isNaN(value)) {
+                    const name = category.textContent.replace(/\\s+/g, ' ').trim();
+                    // Keep each row's first priced card, as a per-row find_element would
+                    if (name in accepted || name in rejected) continue;
+                    (value >= minPrice && value <= maxPrice ? accepted : rejected)[name] = value;
+                }
+            }
+            return {accepted, rejected};
+        """, ROW_SELECTOR[1], CATEGORY_NAME_SELECTOR[1], PRICED_CARD_SELECTOR[1], MIN_PRICE, MAX_PRICE)
+        prices, rejected = result['accepted'], result['rejected']
+        print(f"Found {len(prices)} car categories")
         
-        for row in car_rows:
-            try:
-                category = row.find_element(By.CSS_SELECTOR, '.car-category-name').text.strip()
-                price = row.find_element(By.CSS_SELECTOR, '.car-result-card.lowest-price').get_attribute('data-price')
-                prices[category] = float(price)
-                print(f"Found {category}: ${price}")
-            except Exception as e:
-                print(f"Error extracting price from row: {str(e)}")
-                continue
+        for category, price in prices.items():
+            print(f"Found {category}: ${price}")
+        if rejected:
+            print("Warning: Suspicious prices skipped: " + ", ".join(
+                f"{category} ${price:.2f}" for category, price in rejected.items()
+            ))
         
         return prices
     
+def _to_form_date(iso_date: str) -> str:
+    """Reformat a YYYY-MM-DD booking date as MM/DD/YYYY by slicing, rejecting anything else"""
+    if not ISO_DATE_PATTERN.fullmatch(iso_date):
+        raise ValueError(f"Booking date {iso_date!r} does not match format YYYY-MM-DD")
+    return f"{iso_date[5:7]}/{iso_date[8:10]}/{iso_date[0:4]}"
+
+@functools.lru_cache(maxsize=4)
+def _create_client(url: str, key: str) -> Client:
+    """Create the process-wide Supabase client on a shared keep-alive HTTP/2 session"""
+    http_client = httpx.Client(
+        http2=True,
+        # Scrapes take tens of seconds, so keep idle connections well past httpx's 5s default
+        limits=httpx.Limits(max_keepalive_connections=32, max_connections=64, keepalive_expiry=60),
+        timeout=30
+    )
+    atexit.register(http_client.close)
+    
+    return create_client(url, key, options=ClientOptions(httpx_client=http_client))
+
 class SupabaseClient:
     """Handles all interactions with Supabase"""
     
     def __init__(self, config: PriceCheckerConfig):
-        self.client: Client = create_client(
+        self.client: Client = _create_client(
             config.supabase_url,
             config.supabase_key
         )
     
+    def iter_booking_pages(self) -> Iterator[List[Dict]]:
+        """Yield bookings page by page with the fields needed for a price check"""
+        offset = 0
+        while True:
+            result = (
+                self.client.table('bookings')
+                .select(BOOKING_COLUMNS)
+                # Postgres only keeps row order stable across pages with an ORDER BY
+                .order('id')
+                .range(offset, offset + BOOKINGS_PAGE_SIZE - 1)
+                .execute()
+            )
+            if result.data:
+                yield result.data
+            if len(result.data) < BOOKINGS_PAGE_SIZE:
+                return
+            offset += BOOKINGS_PAGE_SIZE
+    
+    def get_bookings(self, booking_ids: List[str]) -> Dict[str, Dict]:
+        """Fetch many bookings by id, returning them keyed by id"""
+        bookings = {}
+        for start in range(0, len(booking_ids), BOOKING_IDS_PER_QUERY):
+            chunk = booking_ids[start:start + BOOKING_IDS_PER_QUERY]
+            result = self.client.table('bookings').select(BOOKING_COLUMNS).in_('id', chunk).execute()
+            bookings.update((booking['id'], booking) for booking in result.data)
+        return bookings
+    
+    def get_booking(self, booking_id: str) -> Dict:
+        """Fetch a single booking by id"""
+        result = self.client.table('bookings').select(BOOKING_COLUMNS).eq('id', booking_id).execute()
+        
+        if not result.data:
+            raise Exception(f"Booking {booking_id} not found")
+        
+        return result.data[0]
+    
+    def build_price_row(self, booking_id: str, prices: Dict[str, float]) -> Dict:
+        """Build a price_history row for a booking's extracted prices"""
+        # Find the lowest price
+        lowest_category = min(prices, key=prices.__getitem__)
+        lowest_price = prices[lowest_category]
+        
+        return {
+            'booking_id': booking_id,
+            'prices': prices,
+            'lowest_price_category': lowest_category,
+            'lowest_price': lowest_price,
+            'created_at': datetime.now().isoformat()
+        }
+    
+    def store_prices_batch(self, rows: List[Dict]) -> None:
+        """
+        Store price_history rows with one insert per PRICE_ROWS_PER_INSERT rows.
+        Each insert is all-or-nothing, so on failure its rows are retried one at
+        a time to keep the good rows and isolate the bad ones.
+        """
+        failed = []
+        for start in range(0, len(rows), PRICE_ROWS_PER_INSERT):
+            chunk = rows[start:start + PRICE_ROWS_PER_INSERT]
+            try:
+                self._insert_price_rows(chunk)
+                print(f"✅ Stored prices for {len(chunk)} booking(s)")
+                continue
+            except Exception as e:
+                print(f"❌ Error storing prices: {str(e)}")
+                if len(rows) == 1:
+                    raise
+                # A single-row chunk has nothing to isolate by retrying row by row
+                if len(chunk) == 1:
+                    failed.append(chunk[0]['booking_id'])
+                    continue
+            
+            print(f"Retrying {len(chunk)} price rows individually...")
+            for row in chunk:
+                try:
+                    self._insert_price_rows([row])
+                except Exception as e:
+                    print(f"❌ Error storing prices for booking {row['booking_id']}: {str(e)}")
+                    failed.append(row['booking_id'])
+        
+        if failed:
+            raise Exception(f"Failed to insert price history for bookings: {', '.join(failed)}")
+    
+    def _insert_price_rows(self, rows: List[Dict]) -> None:
+        """Insert rows into price_history, raising if any were not stored"""
+        result = self.client.table('price_history').insert(rows).execute()
+        
+        if len(result.data) != len(rows):
+            raise Exception("Failed to insert price history")
+    
     def store_prices(self, booking_id: str, prices: Dict[str, float]) -> None:
         """Store price data in Supabase"""
+        self.store_prices_batch([self.build_price_row(booking_id, prices)])
+
+class WebDriverPool:
+    """
+    Pool of Chrome drivers leased one booking at a time, so Chrome startup is
+    paid once per worker instead of once per booking. Drivers are started lazily,
+    on the first lease that finds no idle driver, and all Selenium calls run on
+    the given executor.
+    """
+    
+    def __init__(self, factory: Callable[[int], webdriver.Chrome], size: int, executor: ThreadPoolExecutor):
+        self._factory = factory
+        self._executor = executor
+        self._slots: Dict[webdriver.Chrome, int] = {}
+        # Idle drivers stack on top of the numbers of slots with no running driver,
+        # so a lease reuses a running driver before it starts another one
+        self._idle: asyncio.LifoQueue[Union[webdriver.Chrome, int]] = asyncio.LifoQueue()
+        for slot in reversed(range(size)):
+            self._idle.put_nowait(slot)
+    
+    async def acquire(self) -> webdriver.Chrome:
+        """Lease a driver, starting one in a free slot if no driver is idle"""
+        entry = await self._idle.get()
+        if isinstance(entry, int):
+            slot, driver = entry, None
+        else:
+            slot, driver = self._slots.pop(entry), entry
+        
         try:
-            # Find the lowest price
-            lowest_category, lowest_price = min(
-                prices.items(), 
-                key=lambda x: x[1]
+            driver = await asyncio.get_running_loop().run_in_executor(
+                self._executor, self._revive, driver, slot
             )
-            
-            # Insert into price_history table
-            data = {
-                'booking_id': booking_id,
-                'prices': prices,
-                'lowest_price_category': lowest_category,
-                'lowest_price': lowest_price,
-                'created_at': datetime.now().isoformat()
-            }
-            
-            result = self.client.table('price_history').insert(data).execute()
-            
-            if len(result.data) == 0:
-                raise Exception("Failed to insert price history")
-                
-            print(f"✅ Stored prices for booking {booking_id}")
-            
-        except Exception as e:
-            print(f"❌ Error storing prices: {str(e)}")
+        except Exception:
+            # Free the slot so the next lease retries the start instead of waiting forever
+            self._idle.put_nowait(slot)
             raise
+        self._slots[driver] = slot
+        return driver
+    
+    async def release(self, driver: webdriver.Chrome) -> None:
+        """Reset a driver's session state and return it to the pool"""
+        await asyncio.get_running_loop().run_in_executor(self._executor, self._reset, driver)
+        self._idle.put_nowait(driver)
+    
+    def close(self) -> None:
+        """Quit every idle driver"""
+        print("\nClosing Chrome drivers...")
+        while not self._idle.empty():
+            driver = self._idle.get_nowait()
+            if isinstance(driver, int):
+                continue
+            try:
+                driver.quit()
+            except Exception as e:
+                print(f"Error closing Chrome driver: {str(e)}")
+    
+    def _revive(self, driver: Optional[webdriver.Chrome], slot: int) -> webdriver.Chrome:
+        """Return the driver if its session is alive, otherwise a freshly started one for its slot"""
+        if driver is not None:
+            try:
+                driver.current_url
+                return driver
+            except Exception:
+                print("Chrome session is no longer alive, starting a new driver...")
+                try:
+                    driver.quit()
+                except Exception:
+                    pass
+        return self._factory(slot)
+    
+    def _reset(self, driver: webdriver.Chrome) -> None:
+        """Clear cookies and park the driver on a blank page so an idle results page stops running"""
+        try:
+            driver.delete_all_cookies()
+            driver.get("about:blank")
+        except Exception as e:
+            # A dead session is replaced on its next lease
+            print(f"Error resetting Chrome driver: {str(e)}")
 
 class PriceChecker:
     """Main service class that coordinates price checking and storage"""
     
-    def __init__(self, config: PriceCheckerConfig):
+    def __init__(self, config: PriceCheckerConfig, pool_size: int = 1):
         self.config = config
         self.supabase = SupabaseClient(config)
+        
+        # Options are built once per pool slot and reused whenever that slot's driver starts
+        self._chrome_options: Dict[Optional[int], webdriver.ChromeOptions] = {}
+        # chromedriver logs every command when verbose; discard its log otherwise
+        if config.chromedriver_verbose:
+            self._service_kwargs = {'service_args': ['--verbose']}
+        else:
+            self._service_kwargs = {'log_output': os.devnull}
+        
+        # One Selenium thread per pooled driver, independent of the loop's default executor
+        self._executor = ThreadPoolExecutor(max_workers=pool_size, thread_name_prefix='price-checker')
+        self._drivers = WebDriverPool(self.setup_driver, pool_size, self._executor)
+        
+        # Screenshots and page dumps go under logs/, written on their own thread
+        # so disk I/O overlaps the next Selenium command
+        self._log_dir = Path('logs')
+        self._log_dir.mkdir(exist_ok=True)
+        self._shot_idx = itertools.count(1)
+        self._log_writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix='price-checker-logs')
+        
+        self._price_cache: TTLCache = TTLCache(maxsize=PRICE_CACHE_SIZE, ttl=PRICE_CACHE_TTL)
+        # One lock per search key, kept only while a check holds or waits on it
+        self._search_locks: Dict[tuple, asyncio.Lock] = {}
+        self._search_lock_users: Counter = Counter()
+        
+        # Page loads are spaced out across all pooled drivers, see _throttle()
+        self._throttle_lock = asyncio.Lock()
+        self._next_page_load = 0.0
+    
+    def __enter__(self) -> 'PriceChecker':
+        return self
+    
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.close()
+    
+    async def __aenter__(self) -> 'PriceChecker':
+        return self
+    
+    async def __aexit__(self, exc_type, exc, tb) -> None:
+        await asyncio.to_thread(self.close)
     
-    def setup_driver(self) -> webdriver.Chrome:
-        """Set up Chrome WebDriver with proper configuration"""
+    def close(self) -> None:
+        """Quit every pooled Chrome driver and finish pending log writes"""
+        self._executor.shutdown(wait=True)
+        self._drivers.close()
+        self._log_writer.shutdown(wait=True)
+    
+    def _build_options(self, profile_slot: Optional[int]) -> webdriver.ChromeOptions:
+        """Return the Chrome options for a pool slot, building them on first use"""
+        if profile_slot in self._chrome_options:
+            return self._chrome_options[profile_slot]
+        
+        options = webdriver.ChromeOptions()
+        options.binary_location = self.config.chrome_binary
+        
+        # Keep the HTTP and code caches between runs; Chrome locks a profile,
+        # so every pooled driver gets a directory of its own
+        if self.config.chrome_profile_dir and profile_slot is not None:
+            profile_dir = os.path.join(self.config.chrome_profile_dir, f"worker-{profile_slot}")
+            options.add_argument(f"--user-data-dir={os.path.abspath(profile_dir)}")
+        
+        # Return from driver.get at DOMContentLoaded; explicit waits handle the rest
+        options.page_load_strategy = 'eager'
+        
+        # Stealth settings
+        options.add_argument('--disable-blink-features=AutomationControlled')
+        options.add_argument('--disable-dev-shm-usage')
+        options.add_argument('--start-maximized')
+        options.add_experimental_option('excludeSwitches', ['enable-automation'])
+        options.add_experimental_option('useAutomationExtension', False)
+        
+        # Skip image downloads entirely; CSS stays for the layout
+        options.add_experimental_option('prefs', {
+            'profile.managed_default_content_settings.images': 2
+        })
+        options.add_argument('--blink-settings=imagesEnabled=false')
+        
+        # The scrape only reads DOM text and attributes, so skip GPU compositing
+        if self.config.chrome_headless:
+            options.add_argument(f'--headless={self.config.chrome_headless}')
+            options.add_argument('--disable-gpu')
+            # options.add_argument('--no-sandbox')
+        
+        self._chrome_options[profile_slot] = options
+        return options
+    
+    def setup_driver(self, profile_slot: Optional[int] = None) -> webdriver.Chrome:
+        """
+        Set up Chrome WebDriver with proper configuration.
+        profile_slot picks this driver's persistent profile when chrome_profile_dir is set.
+        """
         try:
-            options = webdriver.ChromeOptions()
-            options.binary_location = self.config.chrome_binary
+            # Each driver owns its chromedriver process (quit() stops it), so a
+            # Service can't be shared between pooled drivers; only its arguments are
+            service = Service(self.config.chromedriver_path, **self._service_kwargs)
+            driver = webdriver.Chrome(service=service, options=self._build_options(profile_slot))
             
-            # Stealth settings
-            options.add_argument('--disable-blink-features=AutomationControlled')
-            options.add_argument('--disable-dev-shm-usage')
-            options.add_argument('--start-maximized')
-            options.add_experimental_option('excludeSwitches', ['enable-automation'])
-            options.add_experimental_option('useAutomationExtension', False)
+            # Block fonts, images and trackers at the network layer
+            driver.execute_cdp_cmd('Network.enable', {})
+            driver.execute_cdp_cmd('Network.setBlockedURLs', {'urls': BLOCKED_URL_PATTERNS})
             
-            # Comment out headless mode for testing
-            # options.add_argument('--headless=new')
-            # options.add_argument('--no-sandbox')
-            
-            service = Service(self.config.chromedriver_path)
-            driver = webdriver.Chrome(service=service, options=options)
+            # All waits are explicit, so element lookups must never block implicitly
+            driver.implicitly_wait(0)
+            driver.set_page_load_timeout(PAGE_LOAD_TIMEOUT)
+            driver.set_script_timeout(FORM_LOAD_TIMEOUT)
             
             return driver
             
@@ -140,109 +466,123 @@ class PriceChecker:
             raise
         
     
-    def fill_search_form(self, driver: webdriver.Chrome, booking: Dict) -> None:
-        """Fill out the search form with booking details"""
+    def _save_screenshot(self, driver: webdriver.Chrome, name: str, timestamp: str, always: bool = False) -> None:
+        """
+        Save a screenshot under logs/, numbered so concurrent checks never overwrite each other.
+        Only taken in debug mode unless always is set.
+        """
+        if not (always or self.config.debug):
+            return
+        self._write_log_file(
+            self._log_dir / f"{name}_{timestamp}_{next(self._shot_idx)}.png", driver.get_screenshot_as_png()
+        )
+    
+    def _write_log_file(self, path: Path, data: Union[bytes, str]) -> None:
+        """Write a screenshot or page dump in the background"""
+        def write():
+            try:
+                with open(path, 'wb' if isinstance(data, bytes) else 'w') as f:
+                    f.write(data)
+            except OSError as e:
+                print(f"❌ Error writing {path}: {str(e)}")
+        
+        self._log_writer.submit(write)
+    
+    def fill_search_form(self, driver: webdriver.Chrome, booking: Dict, timestamp: str) -> None:
+        """Fill out the search form with booking details; timestamp tags this run's screenshots"""
         try:
             print("\nFilling search form details...")
             
-            # Wait for page load
+            # Wait for every form widget in one call; the browser polls every 50ms
+            # instead of each WebDriverWait polling over the wire every 500ms
             print("Waiting for form to load...")
-            WebDriverWait(driver, 20).until(
-                EC.presence_of_element_located((By.ID, "pickupLocationTextWidget"))
-            )
+            driver.execute_async_script("""
+                const [ids, done] = arguments;
+                const check = () => ids.every(id => document.getElementById(id)) ? done(true) : setTimeout(check, 50);
+                check();
+            """, FORM_WIDGET_IDS)
             
             # Take screenshot before form fill
-            os.makedirs('logs', exist_ok=True)
-            timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-            driver.save_screenshot(f"logs/before_form_{timestamp}.png")
+            self._save_screenshot(driver, 'before_form', timestamp)
 
             # Location input
             print("Entering location...")
-            location_input = driver.find_element(By.ID, "pickupLocationTextWidget")
-            driver.execute_script("arguments[0].click();", location_input)
-            location_input.clear()
+            # Find, focus and clear the input in one call; the text itself is typed
+            # so the autocomplete sees real keystrokes
+            location_input = driver.execute_script("""
+                const input = document.getElementById(arguments[0]);
+                input.click();
+                input.value = '';
+                return input;
+            """, LOCATION_INPUT[1])
             location_input.send_keys(booking['location'])
-            time.sleep(2)  # Increased wait time
 
-            # Wait for and select from dropdown
+            # Wait for and select from dropdown; the waits below poll for the
+            # suggestion list, so no fixed pause is needed after typing
             print("Selecting from dropdown...")
             try:
-                dropdown_item = WebDriverWait(driver, 10).until(
-                    EC.presence_of_element_located((By.XPATH, 
-                        f"//li[contains(@class, 'ui-menu-item')]//span[contains(text(), '{booking['location']}')]"
-                    ))
-                )
-                driver.execute_script("arguments[0].click();", dropdown_item)
+                # Find and click the visible suggestion matching the location in the
+                # page, one round-trip per poll instead of one per suggestion
+                dropdown_item = WebDriverWait(driver, 10).until(lambda d: d.execute_script("""
+                    const [selector, location] = arguments;
+                    const match = [...document.querySelectorAll(selector)]
+                        .find(s => s.offsetParent !== null && s.textContent.includes(location));
+                    if (match) match.click();
+                    return match || false;
+                """, LOCATION_SUGGESTION_SELECTOR[1], booking['location']))
             except Exception as e:
                 print(f"Dropdown selection failed: {str(e)}")
                 try:
                     # Fallback: Try clicking first suggestion
                     dropdown_item = WebDriverWait(driver, 10).until(
-                        EC.presence_of_element_located((By.CSS_SELECTOR, "ul.ui-autocomplete li:first-child"))
+                        EC.presence_of_element_located(FIRST_SUGGESTION_SELECTOR)
                     )
                     driver.execute_script("arguments[0].click();", dropdown_item)
                 except Exception as e:
                     print(f"Fallback dropdown selection failed: {str(e)}")
                     raise
 
-            time.sleep(1)
+            # Wait for the autocomplete menu to close on the selected item
+            WebDriverWait(driver, 5).until(EC.invisibility_of_element(dropdown_item))
 
             # Format dates correctly (MM/DD/YYYY)
-            pickup_date = datetime.strptime(booking['pickup_date'], "%Y-%m-%d").strftime("%m/%d/%Y")
-            dropoff_date = datetime.strptime(booking['dropoff_date'], "%Y-%m-%d").strftime("%m/%d/%Y")
+            pickup_date = _to_form_date(booking['pickup_date'])
+            dropoff_date = _to_form_date(booking['dropoff_date'])
 
             print(f"Formatted dates: {pickup_date} to {dropoff_date}")
 
-            # # Dates
-            # print("Setting dates...")
-            # pickup_date = driver.find_element(By.ID, "pickUpDateWidget")
-            # dropoff_date = driver.find_element(By.ID, "dropOffDateWidget")
-            
-            # Set dates with correct format
-            pickup_element = driver.find_element(By.ID, "pickUpDateWidget")
-            dropoff_element = driver.find_element(By.ID, "dropOffDateWidget")
-            
-            driver.execute_script("arguments[0].value = '';", pickup_element)
-            driver.execute_script("arguments[0].value = '';", dropoff_element)
-            driver.execute_script(f"arguments[0].value = '{pickup_date}'", pickup_element)
-            driver.execute_script(f"arguments[0].value = '{dropoff_date}'", dropoff_element)
-            
-            # Trigger change events
-            driver.execute_script("arguments[0].dispatchEvent(new Event('change'))", pickup_element)
-            driver.execute_script("arguments[0].dispatchEvent(new Event('change'))", dropoff_element)
+            # Set dates and tick the age checkbox in a single script call
+            print("Setting dates and age checkbox...")
+            driver.execute_script("""
+                const [pickupDate, dropoffDate] = arguments;
+                for (const [id, value] of [['pickUpDateWidget', pickupDate], ['dropOffDateWidget', dropoffDate]]) {
+                    const input = document.getElementById(id);
+                    input.value = value;
+                    input.dispatchEvent(new Event('input', {bubbles: true}));
+                    input.dispatchEvent(new Event('change', {bubbles: true}));
+                }
+                const ageCheckbox = document.getElementById('driversAgeWidget');
+                if (!ageCheckbox.checked) ageCheckbox.click();
+            """, pickup_date, dropoff_date)
 
             # Times
             print("Setting times...")
-            def convert_time(time_str: str) -> str:
-                """Convert standard time to Costco's format"""
-                return "Noon" if time_str == "12:00 PM" else time_str
+            pickup_time = driver.find_element(*PICKUP_TIME_SELECT)
+            dropoff_time = driver.find_element(*DROPOFF_TIME_SELECT)
             
-            pickup_time = WebDriverWait(driver, 10).until(
-                EC.presence_of_element_located((By.ID, "pickupTimeWidget"))
+            Select(pickup_time).select_by_visible_text(
+                COSTCO_TIME_LABELS.get(booking['pickup_time'], booking['pickup_time'])
             )
-            dropoff_time = WebDriverWait(driver, 10).until(
-                EC.presence_of_element_located((By.ID, "dropoffTimeWidget"))
+            Select(dropoff_time).select_by_visible_text(
+                COSTCO_TIME_LABELS.get(booking['dropoff_time'], booking['dropoff_time'])
             )
-            
-            Select(pickup_time).select_by_visible_text(convert_time(booking['pickup_time']))
-            Select(dropoff_time).select_by_visible_text(convert_time(booking['dropoff_time']))
-
-            # Age checkbox
-            print("Setting age checkbox...")
-            age_checkbox = WebDriverWait(driver, 10).until(
-                EC.presence_of_element_located((By.ID, "driversAgeWidget"))
-            )
-            if not age_checkbox.is_selected():
-                driver.execute_script("arguments[0].click();", age_checkbox)
 
             # Take screenshot before search
-            driver.save_screenshot(f"logs/before_search_{timestamp}.png")
+            self._save_screenshot(driver, 'before_search', timestamp)
 
             # Click search and wait for results
             print("Clicking search...")
-            search_button = WebDriverWait(driver, 10).until(
-                EC.element_to_be_clickable((By.ID, "findMyCarButton"))
-            )
+            search_button = driver.find_element(*SEARCH_BUTTON)
             driver.execute_script("arguments[0].click();", search_button)
 
             # In fill_search_form(), update the results waiting section:
@@ -254,24 +594,26 @@ class PriceChecker:
                 
                 # Wait for car listings
                 car_listings = WebDriverWait(driver, 60).until(
-                    EC.presence_of_all_elements_located((By.CSS_SELECTOR, 'div[role="row"] .car-result-card'))
+                    EC.presence_of_all_elements_located(RESULT_CARD_SELECTOR)
                 )
                 print(f"Found {len(car_listings)} car listings")
                 
                 # Take screenshot of results
-                driver.save_screenshot(f"logs/results_{timestamp}.png")
+                self._save_screenshot(driver, 'results', timestamp)
                 
             except TimeoutException as e:
                 print("Timeout waiting for car listings")
-                driver.save_screenshot(f"logs/timeout_{timestamp}.png")
+                self._save_screenshot(driver, 'timeout', timestamp)
                 print(f"Current URL: {driver.current_url}")
                 raise
             except Exception as e:
                 print(f"Error waiting for results: {str(e)}")
                 raise
 
-            # Final wait for prices
-            time.sleep(5)
+            # Wait for prices to be populated on the result cards
+            WebDriverWait(driver, 30).until(
+                EC.presence_of_element_located(PRICED_CARD_SELECTOR)
+            )
             print("✅ Form submitted successfully")
 
         except Exception as e:
@@ -281,210 +623,154 @@ class PriceChecker:
             print(f"\nPage state:")
             print(f"Current URL: {driver.current_url}")
             
-            timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-            driver.save_screenshot(f"logs/error_state_{timestamp}.png")
-            with open(f"logs/page_source_{timestamp}.html", 'w') as f:
-                f.write(driver.page_source)
+            # The error-state dump is kept outside debug mode to diagnose failed checks
+            self._save_screenshot(driver, 'error_state', timestamp, always=True)
+            self._write_log_file(
+                self._log_dir / f"page_source_{timestamp}_{next(self._shot_idx)}.html", driver.page_source
+            )
                 
             raise
     
     
     
-    async def check_prices(self, booking_id: str) -> None:
-        """Check prices for a specific booking"""
+    def _check_prices_sync(self, booking: Dict, driver: webdriver.Chrome) -> Dict[str, float]:
+        """Run the blocking Selenium flow for one booking on a leased driver"""
+        # One timestamp per check; screenshot names add a counter to stay unique
+        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+        
         try:
-            print(f"\nChecking prices for booking: {booking_id}")
-            result = self.supabase.client.table('bookings').select('*').eq('id', booking_id).execute()
+            # Navigate to Costco Travel
+            print("\nNavigating to Costco Travel...")
+            driver.get("https://www.costcotravel.com/Rental-Cars")
+            print("Current URL:", driver.current_url)
             
-            if not result.data:
-                raise Exception(f"Booking {booking_id} not found")
+            # Take screenshot before form fill
+            self._save_screenshot(driver, 'before_form', timestamp)
             
-            booking = result.data[0]
-            print(f"Found booking: {booking['location']} ({booking['pickup_date']} - {booking['dropoff_date']})")
+            # Fill out the form (waits for the location widget itself)
+            print("Page loaded, filling search form...")
+            self.fill_search_form(driver, booking, timestamp)
+            print("Search form filled")
             
-            driver = self.setup_driver()
+            # Take screenshot after search
+            self._save_screenshot(driver, 'after_search', timestamp)
+            
+            # Extract prices
+            extractor = PriceExtractor(driver)
+            prices = extractor.extract_prices()
+            print(f"Extracted {len(prices)} prices")
+            return prices
             
-            try:
-                # Navigate to Costco Travel
-                print("\nNavigating to Costco Travel...")
-                driver.get("https://www.costcotravel.com/Rental-Cars")
-                print("Current URL:", driver.current_url)
-                
-                # Take screenshot before form fill
-                os.makedirs('logs', exist_ok=True)
-                timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-                driver.save_screenshot(f"logs/before_form_{timestamp}.png")
-                
-                time.sleep(2)  # Allow page to load
-                print("Page loaded, filling search form...")
-                
-                # Fill out the form
-                self.fill_search_form(driver, booking)
-                print("Search form filled")
-                
-                # Take screenshot after search
-                driver.save_screenshot(f"logs/after_search_{timestamp}.png")
-                
-                # Extract prices
-                extractor = PriceExtractor(driver)
-                prices = extractor.extract_prices()
-                print(f"Extracted {len(prices)} prices")
-                
-                # Store prices in Supabase
-                self.supabase.store_prices(booking_id, prices)
-                
-            except Exception as e:
-                print(f"❌ Error during price check: {str(e)}")
-                driver.save_screenshot(f"logs/error_{timestamp}.png")
-                print("\nPage source at time of error:")
-                print(driver.page_source[:500] + "...")  # Print first 500 chars
-                raise
-            finally:
-                print("\nClosing Chrome driver...")
-                driver.quit()
-                
         except Exception as e:
-            print(f"❌ Error checking prices: {str(e)}")
+            print(f"❌ Error during price check: {str(e)}")
+            self._save_screenshot(driver, 'error', timestamp)
+            if logging.getLogger().isEnabledFor(logging.DEBUG):
+                # Slice in the browser so only the preview crosses the WebDriver wire
+                print("\nPage source at time of error:")
+                print(driver.execute_script("return document.documentElement.outerHTML.slice(0, 500);") + "...")
             raise
-    # def fill_search_form(self, driver: webdriver.Chrome, booking: Dict) -> None:
-        """Fill out the search form with booking details"""
+    
+    async def _throttle(self) -> None:
+        """Wait until at least min_request_interval has passed since the last search started"""
+        async with self._throttle_lock:
+            loop = asyncio.get_running_loop()
+            delay = self._next_page_load - loop.time()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            self._next_page_load = loop.time() + self.config.min_request_interval
+    
+    @contextlib.asynccontextmanager
+    async def _search_lock(self, search_key: tuple):
+        """Hold the lock for a search key, dropping it once no check is using or waiting on it"""
+        lock = self._search_locks.setdefault(search_key, asyncio.Lock())
+        self._search_lock_users[search_key] += 1
         try:
-            # Location input with wait and retry
-            print("Filling location...")
-            location_input = WebDriverWait(driver, 20).until(
-                EC.presence_of_element_located((By.ID, "pickupLocationTextWidget"))
-            )
-            location_input.clear()
-            location_input.send_keys(booking['location'])
-            
-            # Select from dropdown
-            try:
-                print("Selecting from dropdown...")
-                location_item = WebDriverWait(driver, 10).until(
-                    EC.presence_of_element_located(
-                        (By.XPATH, f"//li[contains(text(), '{booking['location']}')]")
-                    )
-                )
-            except:
-                # Try alternative xpath if exact match fails
-                location_item = WebDriverWait(driver, 10).until(
-                    EC.presence_of_element_located(
-                        (By.XPATH, f"//li[contains(., '{booking['location']}')]")
-                    )
-                )
-            location_item.click()
-            time.sleep(1)  # Allow dropdown to close
-            
-            print("Filling dates...")
-            # Dates with explicit format
-            pickup_date = WebDriverWait(driver, 10).until(
-                EC.presence_of_element_located((By.ID, "pickUpDateWidget"))
-            )
-            dropoff_date = driver.find_element(By.ID, "dropOffDateWidget")
-            
-            # Clear date fields
-            pickup_date.clear()
-            dropoff_date.clear()
-            
-            # Set dates
-            driver.execute_script(f"arguments[0].value = '{booking['pickup_date']}'", pickup_date)
-            driver.execute_script(f"arguments[0].value = '{booking['dropoff_date']}'", dropoff_date)
-            
-            # Trigger change events
-            driver.execute_script("arguments[0].dispatchEvent(new Event('change'))", pickup_date)
-            driver.execute_script("arguments[0].dispatchEvent(new Event('change'))", dropoff_date)
-            
-            print("Setting times...")
-            # Convert times to Costco format
-            def convert_to_costco_time(time_str: str) -> str:
-                if time_str == "12:00 PM":
-                    return "Noon"
-                elif time_str == "12:00 AM":
-                    return "Midnight"
-                return time_str
-            
-            # Times - Use Costco's format
-            pickup_time_select = Select(WebDriverWait(driver, 10).until(
-                EC.presence_of_element_located((By.ID, "pickupTimeWidget"))
-            ))
-            dropoff_time_select = Select(driver.find_element(By.ID, "dropoffTimeWidget"))
-            
-            pickup_options = [opt.text for opt in pickup_time_select.options]
-            print(f"Available pickup times: {pickup_options}")
-            
-            costco_pickup_time = convert_to_costco_time(booking['pickup_time'])
-            costco_dropoff_time = convert_to_costco_time(booking['dropoff_time'])
-            
-            print(f"Selecting pickup time: {costco_pickup_time}")
-            print(f"Selecting dropoff time: {costco_dropoff_time}")
-            
-            pickup_time_select.select_by_visible_text(costco_pickup_time)
-            dropoff_time_select.select_by_visible_text(costco_dropoff_time)
-            
-            print("Checking age checkbox...")
-            age_checkbox = WebDriverWait(driver, 10).until(
-                EC.presence_of_element_located((By.ID, "driversAgeWidget"))
-            )
-            if not age_checkbox.is_selected():
-                driver.execute_script("arguments[0].click();", age_checkbox)
-            
-            # Take a screenshot before clicking search
-            timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-            driver.save_screenshot(f"logs/before_search_{timestamp}.png")
+            async with lock:
+                yield
+        finally:
+            self._search_lock_users[search_key] -= 1
+            if not self._search_lock_users[search_key]:
+                del self._search_lock_users[search_key]
+                del self._search_locks[search_key]
+    
+    async def check_prices(self, booking: Union[str, Dict], store: bool = True) -> Dict[str, float]:
+        """
+        Check prices for a booking, given either its id or an already-loaded row.
+        Pass store=False to skip the insert and batch it with other bookings instead.
+        """
+        try:
+            if isinstance(booking, str):
+                booking = await asyncio.to_thread(self.supabase.get_booking, booking)
+            booking_id = booking['id']
             
-            print("Clicking search button...")
-            search_button = WebDriverWait(driver, 10).until(
-                EC.element_to_be_clickable((By.ID, "findMyCarButton"))
-            )
-            driver.execute_script("arguments[0].click();", search_button)
+            print(f"\nChecking prices for booking: {booking_id}")
+            print(f"Found booking: {booking['location']} ({booking['pickup_date']} - {booking['dropoff_date']})")
             
-            print("Waiting for results...")
-            # Wait for either results page or loading indicator
-            def check_results_or_loading(d):
-                try:
-                    current_url = d.current_url.lower()
-                    page_source = d.page_source.lower()
-                    
-                    # Debug logging
-                    print(f"Current URL: {current_url}")
-                    if "searching" in page_source:
-                        print("Found 'searching' text in page")
-                    if "loading" in page_source:
-                        print("Found 'loading' text in page")
+            # Duplicate searches wait on the first one and reuse its prices
+            search_key = tuple(booking[field] for field in SEARCH_KEY_FIELDS)
+            async with self._search_lock(search_key):
+                prices = self._price_cache.get(search_key)
+                
+                if prices is not None:
+                    print(f"Using cached prices for booking {booking_id}")
+                else:
+                    driver = await self._drivers.acquire()
                     
-                    # Take progress screenshot
-                    timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-                    d.save_screenshot(f"logs/waiting_results_{timestamp}.png")
+                    try:
+                        await self._throttle()
+                        # Selenium calls block, so run them off the event loop
+                        prices = await asyncio.get_running_loop().run_in_executor(
+                            self._executor, self._check_prices_sync, booking, driver
+                        )
+                    finally:
+                        await self._drivers.release(driver)
                     
-                    return (
-                        "results" in current_url or
-                        "vehicles" in current_url or
-                        current_url != "https://www.costcotravel.com/Rental-Cars"
-                    )
-                except Exception as e:
-                    print(f"Error in check_results_or_loading: {str(e)}")
-                    return False
-            
-            # Wait with progress logging
-            start_time = time.time()
-            while time.time() - start_time < 60:  # 60 second timeout
-                if check_results_or_loading(driver):
-                    print("Results page detected!")
-                    break
-                time.sleep(2)
-            else:
-                raise Exception("Timeout waiting for results page")
-            
-            # Final wait for prices to load
-            print("Waiting for prices to load...")
-            time.sleep(5)
-            
+                    # An empty scrape is a failed page load, not a result to share
+                    if prices:
+                        self._price_cache[search_key] = prices
+            
+            # Store prices in Supabase
+            if store:
+                await asyncio.to_thread(self.supabase.store_prices, booking_id, prices)
+            return prices
+                
         except Exception as e:
-            print(f"❌ Error filling search form: {str(e)}")
-            timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-            os.makedirs('logs', exist_ok=True)
-            driver.save_screenshot(f"logs/error_screenshot_{timestamp}.png")
-            # Print the page source
-            print("\nPage source at time of error:")
-            print(driver.page_source[:1000])  # Print first 1000 chars
-            raise
\ No newline at end of file
+            print(f"❌ Error checking prices: {str(e)}")
+            raise
+    
+    async def check_prices_batch(self, bookings: List[Union[str, Dict]], store: bool = True) -> Dict[str, Dict[str, float]]:
+        """
+        Check prices for many bookings at once, one per pooled driver at a time.
+        Returns prices keyed by booking id; failed bookings are reported and left out.
+        """
+        # Load any bookings given by id with one query instead of one per booking
+        booking_ids = [booking for booking in bookings if isinstance(booking, str)]
+        if booking_ids:
+            loaded = await asyncio.to_thread(self.supabase.get_bookings, booking_ids)
+            bookings = [
+                loaded.get(booking, booking) if isinstance(booking, str) else booking
+                for booking in bookings
+            ]
+        
+        results = await asyncio.gather(
+            *[self.check_prices(booking, store=False) for booking in bookings],
+            return_exceptions=True
+        )
+        
+        prices_by_booking = {}
+        for booking, result in zip(bookings, results):
+            booking_id = booking if isinstance(booking, str) else booking['id']
+            if isinstance(result, Exception):
+                print(f"❌ Skipping booking {booking_id}: {str(result)}")
+                continue
+            prices_by_booking[booking_id] = result
+        
+        # Store every booking's prices in as few inserts as possible
+        if store and prices_by_booking:
+            rows = [
+                self.supabase.build_price_row(booking_id, prices)
+                for booking_id, prices in prices_by_booking.items()
+            ]
+            await asyncio.to_thread(self.supabase.store_prices_batch, rows)
+        
+        return prices_by_booking
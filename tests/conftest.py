@@ -0,0 +1,6 @@
+import os
+import sys
+
+# The service modules import each other as top-level packages from src/,
+# the same way run_price_checker.py runs them
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
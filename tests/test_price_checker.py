@@ -0,0 +1,41 @@
+import pytest
+from selenium.common.exceptions import TimeoutException
+
+from services import price_checker
+from services.price_checker import PriceChecker, PriceCheckerConfig
+
+
+@pytest.fixture
+def config_env(monkeypatch):
+    """Set the environment PriceCheckerConfig requires"""
+    monkeypatch.setenv('SUPABASE_URL', 'https://example.supabase.co')
+    monkeypatch.setenv('SUPABASE_SERVICE_KEY', 'header.payload.signature')
+    monkeypatch.setenv('CHROME_BINARY_PATH', '/usr/bin/chromium')
+    monkeypatch.setenv('CHROMEDRIVER_PATH', '/usr/bin/chromedriver')
+
+
+def test_price_checker_exposes_fill_search_form(config_env, monkeypatch, tmp_path):
+    monkeypatch.chdir(tmp_path)
+    
+    # Building the checker starts no browser; drivers are only launched on first lease
+    with PriceChecker(PriceCheckerConfig()) as checker:
+        assert callable(checker.fill_search_form)
+    
+    # fill_search_form's results wait catches TimeoutException by name
+    assert getattr(price_checker, 'TimeoutException', None) is TimeoutException
+
+
+def test_to_form_date_reformats_iso_dates():
+    assert price_checker._to_form_date('2025-03-07') == '03/07/2025'
+
+
+@pytest.mark.parametrize('bad_date', ['03/07/2025', '2025-3-7', '2025-03-07T10:00', ''])
+def test_to_form_date_rejects_other_formats(bad_date):
+    with pytest.raises(ValueError):
+        price_checker._to_form_date(bad_date)
+
+
+def test_empty_chrome_headless_means_visible_browser(config_env, monkeypatch):
+    monkeypatch.setenv('CHROME_HEADLESS', '')
+    
+    assert PriceCheckerConfig().chrome_headless is None
@@ -0,0 +1,53 @@
+import pytest
+
+from services import price_checker
+from services.price_checker import SupabaseClient
+
+
+def make_client(fail_ids):
+    """SupabaseClient whose inserts fail for any chunk containing one of fail_ids"""
+    client = SupabaseClient.__new__(SupabaseClient)
+    client.inserts = []
+    client.stored = []
+    
+    def insert_price_rows(rows):
+        client.inserts.append([row['booking_id'] for row in rows])
+        if any(row['booking_id'] in fail_ids for row in rows):
+            raise Exception("insert failed")
+        client.stored.extend(row['booking_id'] for row in rows)
+    
+    client._insert_price_rows = insert_price_rows
+    return client
+
+
+def rows_for(*booking_ids):
+    return [{'booking_id': booking_id} for booking_id in booking_ids]
+
+
+def test_store_prices_batch_retries_failed_chunk_row_by_row(monkeypatch):
+    monkeypatch.setattr(price_checker, 'PRICE_ROWS_PER_INSERT', 3)
+    client = make_client({'b'})
+    
+    with pytest.raises(Exception, match="bookings: b$"):
+        client.store_prices_batch(rows_for('a', 'b', 'c', 'd', 'e'))
+    
+    assert client.stored == ['a', 'c', 'd', 'e']
+    assert client.inserts == [['a', 'b', 'c'], ['a'], ['b'], ['c'], ['d', 'e']]
+
+
+def test_store_prices_batch_does_not_retry_single_row_chunk(monkeypatch):
+    monkeypatch.setattr(price_checker, 'PRICE_ROWS_PER_INSERT', 2)
+    client = make_client({'c'})
+    
+    with pytest.raises(Exception, match="bookings: c$"):
+        client.store_prices_batch(rows_for('a', 'b', 'c'))
+    
+    assert client.stored == ['a', 'b']
+    assert client.inserts == [['a', 'b'], ['c']]
+
+
+def test_store_prices_batch_reraises_single_row_error():
+    client = make_client({'a'})
+    
+    with pytest.raises(Exception, match="^insert failed$"):
+        client.store_prices_batch(rows_for('a'))